@@ -6,8 +6,10 @@ from sqlalchemy.engine import Connection
 from sqlalchemy.ext.asyncio import async_engine_from_config
 
 from alembic import context
-from app.config import settings
-from app.db import Base
+# Only torch-free modules are imported here; migrations must not pull in
+# the inference stack
+from config import CONFIG
+from db import Base
 
 config = context.config
 
@@ -15,6 +17,9 @@ config = context.config
 if config.config_file_name is not None:
     fileConfig(config.config_file_name)
 
+if CONFIG['DATABASE_URL']:
+    config.set_main_option("sqlalchemy.url", CONFIG['DATABASE_URL'])
+
 
 target_metadata = Base.metadata
 
@@ -31,7 +36,7 @@ def run_migrations_offline() -> None:
     script output.
 
     """
-    url = settings.database_url
+    url = config.get_main_option("sqlalchemy.url")
     context.configure(
         url=url,
         target_metadata=target_metadata,
@@ -0,0 +1,46 @@
+"""add predictions and daily disease rollups
+
+Revision ID: b7c4e1f2a9d3
+Revises: 21d62448899a
+Create Date: 2026-10-19 09:12:44.518203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7c4e1f2a9d3'
+down_revision: Union[str, None] = '21d62448899a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('predictions',
+    sa.Column('id', sa.BigInteger(), nullable=False),
+    sa.Column('class_id', sa.SmallInteger(), nullable=False),
+    sa.Column('confidence', sa.Float(), nullable=False),
+    sa.Column('region', sa.String(length=64), nullable=True),
+    sa.Column('crop', sa.String(length=64), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_predictions_created_at'), 'predictions', ['created_at'], unique=False)
+    op.create_table('disease_daily_rollups',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('class_id', sa.SmallInteger(), nullable=False),
+    sa.Column('region', sa.String(length=64), nullable=False),
+    sa.Column('crop', sa.String(length=64), nullable=False),
+    sa.Column('count', sa.BigInteger(), nullable=False),
+    sa.Column('confidence_sum', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('day', 'class_id', 'region', 'crop')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('disease_daily_rollups')
+    op.drop_index(op.f('ix_predictions_created_at'), table_name='predictions')
+    op.drop_table('predictions')
@@ -0,0 +1,96 @@
+from datetime import date, datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import select, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import db
+from db import DiseaseDailyRollup, Prediction
+from labels import DISEASE_CLASSES
+
+CLASS_IDS = {disease: class_id for class_id, disease in enumerate(DISEASE_CLASSES)}
+
+
+async def record_prediction(disease: str, confidence: float,
+                            region: Optional[str] = None, crop: Optional[str] = None) -> None:
+    """
+    Store a prediction and fold it into its daily rollup in one transaction.
+    Meant to run as a background task after the response was sent.
+
+    Args:
+        disease: Predicted class label from DISEASE_CLASSES
+        confidence: Confidence percentage of the prediction
+        region: Optional region tag sent by the client
+        crop: Optional crop tag sent by the client
+    """
+    if db.AsyncSessionLocal is None or disease not in CLASS_IDS:
+        return
+
+    class_id = CLASS_IDS[disease]
+    created_at = datetime.now(timezone.utc)
+
+    rollup = insert(DiseaseDailyRollup).values(
+        day=created_at.date(),
+        class_id=class_id,
+        region=region or "",
+        crop=crop or "",
+        count=1,
+        confidence_sum=confidence,
+    )
+    rollup = rollup.on_conflict_do_update(
+        index_elements=[DiseaseDailyRollup.day, DiseaseDailyRollup.class_id,
+                        DiseaseDailyRollup.region, DiseaseDailyRollup.crop],
+        set_={
+            "count": DiseaseDailyRollup.count + 1,
+            "confidence_sum": DiseaseDailyRollup.confidence_sum + rollup.excluded.confidence_sum,
+        },
+    )
+
+    try:
+        async with db.AsyncSessionLocal() as session:
+            async with session.begin():
+                session.add(Prediction(class_id=class_id, confidence=confidence,
+                                       region=region, crop=crop, created_at=created_at))
+                await session.execute(rollup)
+    except Exception as e:
+        print(f"Error recording prediction: {str(e)}")
+
+
+async def disease_stats(session: AsyncSession, start: date, end: date,
+                        region: Optional[str] = None, crop: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Disease counts per day, class and region between `start` and `end`
+    (inclusive). Reads only the rollup table, so the cost depends on the
+    number of days and classes, not on how many predictions were stored.
+    """
+    query = select(
+        DiseaseDailyRollup.day,
+        DiseaseDailyRollup.class_id,
+        DiseaseDailyRollup.region,
+        func.sum(DiseaseDailyRollup.count),
+        func.sum(DiseaseDailyRollup.confidence_sum),
+    ).where(DiseaseDailyRollup.day.between(start, end))
+
+    if region is not None:
+        query = query.where(DiseaseDailyRollup.region == region)
+    if crop is not None:
+        query = query.where(DiseaseDailyRollup.crop == crop)
+
+    query = query.group_by(
+        DiseaseDailyRollup.day, DiseaseDailyRollup.class_id, DiseaseDailyRollup.region
+    ).order_by(DiseaseDailyRollup.day, DiseaseDailyRollup.class_id)
+
+    result = await session.execute(query)
+    stats = []
+    for day, class_id, row_region, count, confidence_sum in result.all():
+        # SUM over BIGINT comes back as NUMERIC
+        count = int(count)
+        stats.append({
+            "day": day,
+            "disease": DISEASE_CLASSES[class_id],
+            "region": row_region or None,
+            "count": count,
+            "mean_confidence": round(float(confidence_sum) / count, 3) if count else 0.0,
+        })
+    return stats
@@ -0,0 +1,79 @@
+import argparse
+import json
+
+from config import CONFIG
+from labels import DISEASE_CLASSES
+
+
+def show_config(args: argparse.Namespace) -> None:
+    """Print the config of the current environment"""
+    print(json.dumps(CONFIG, indent=4))
+
+
+def show_labels(args: argparse.Namespace) -> None:
+    """Print the class labels with their output index"""
+    for index, label in enumerate(DISEASE_CLASSES):
+        print(f"{index}\t{label}")
+
+
+def run_evaluation(args: argparse.Namespace) -> None:
+    """Evaluate model checkpoints on a labelled image set"""
+    from config import get_device
+    from evaluate import MODEL_VARIANTS, apply_variant, evaluate_model, load_tensor_store
+    from model import load_model
+
+    variants = args.variant or ["fp32"]
+    unknown = [variant for variant in variants if variant not in MODEL_VARIANTS]
+    if unknown:
+        raise SystemExit(f"Unknown variant(s) {', '.join(unknown)}, expected one of {', '.join(MODEL_VARIANTS)}")
+
+    images, labels = load_tensor_store(args.image_dir, args.cache_dir, args.image_size, args.rebuild)
+    device = get_device()
+
+    report = {}
+    for path in args.model or [CONFIG['MODEL_PATH']]:
+        for variant in variants:
+            # fp32 keeps the bare checkpoint path as its key
+            key = path if variant == "fp32" else f"{path}+{variant}"
+            model = apply_variant(load_model(path, device), variant, device)
+            report[key] = evaluate_model(model, images, labels, device, args.batch_size)
+            if not args.confusion:
+                del report[key]["confusion"]
+    print(json.dumps(report, indent=4))
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """
+    Build the command line parser. Subcommands that run inference import
+    torch inside their handler, never at module level.
+    """
+    parser = argparse.ArgumentParser(description="Crop disease detection backend tools")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("config", help=show_config.__doc__).set_defaults(handler=show_config)
+    subparsers.add_parser("labels", help=show_labels.__doc__).set_defaults(handler=show_labels)
+
+    evaluate = subparsers.add_parser("evaluate", help=run_evaluation.__doc__)
+    evaluate.add_argument("image_dir", help="folder with one sub-folder of images per class")
+    evaluate.add_argument("--model", action="append",
+                          help="checkpoint to evaluate, repeat to compare (default: MODEL_PATH)")
+    evaluate.add_argument("--variant", action="append",
+                          help="fp32, dynamic-int8 or channels_last, repeat to compare (default: fp32)")
+    evaluate.add_argument("--cache-dir", default="./data/eval_cache",
+                          help="where preprocessed tensor stores are kept")
+    evaluate.add_argument("--image-size", type=int, default=224)
+    evaluate.add_argument("--batch-size", type=int, default=64)
+    evaluate.add_argument("--rebuild", action="store_true", help="rebuild the tensor store")
+    evaluate.add_argument("--confusion", action="store_true", help="include the full confusion matrix")
+    evaluate.set_defaults(handler=run_evaluation)
+
+    return parser
+
+
+def main(argv=None) -> None:
+    args = build_parser().parse_args(argv)
+    args.handler(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,12 @@
 import os
-import torch
+from functools import lru_cache
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+# Before get_config() below reads the environment, so values from .env
+# apply to every importer (the app, the CLI and alembic alike)
+load_dotenv(Path(__file__).parent.parent / '.env')
 
 
 # Config that serves all environment
@@ -7,7 +14,39 @@ GLOBAL_CONFIG = {
     "MODEL_PATH": "./public/best_finetuned_model.pth",
     "SCALAR_PATH": "../public/scaler.joblib",
     "USE_CUDE_IF_AVAILABLE": True,
-    "ROUND_DIGIT": 6
+    "ROUND_DIGIT": 6,
+    # Per-request profiling; PROFILE_SAMPLE_EVERY=0 disables sampling
+    "PROFILE_DIR": "./data/profiles",
+    "PROFILE_MAX_TRACES": 20,
+    "PROFILE_SAMPLE_EVERY": 0,
+    # Batch sizes served by the inference path, warmed up before /readyz passes
+    "WARMUP_BATCH_SIZES": [1],
+    "WARMUP_ITERATIONS": 3,
+    # Side length of the class activation heatmaps returned with ?cam=true
+    "CAM_SIZE": 56,
+    # Decode/preprocess worker processes for /predict; 0 keeps it in-process
+    "PREPROCESS_WORKERS": 0,
+    "PREPROCESS_RING_SLOTS": 16,
+    # Concurrent forward passes fed by the ring, and requests allowed to wait
+    # for a free slot before the pool answers 503
+    "PREPROCESS_INFERENCE_THREADS": 1,
+    "PREPROCESS_MAX_WAITING": 32,
+    # Shadow evaluation of a candidate checkpoint, enabled by SHADOW_MODEL_PATH
+    "SHADOW_SAMPLE_RATE": 0.05,
+    "SHADOW_MAX_PENDING": 8,
+    # torch threads of the shadow worker process, its whole CPU budget
+    "SHADOW_THREADS": 1,
+    # Pre-inference image quality gate, see quality.py. Off until the
+    # thresholds are tuned on labelled field photos with `cli.py evaluate`
+    "QUALITY_GATE_ENABLED": False,
+    "QUALITY_THRESHOLDS": {
+        "min_sharpness": 15.0,
+        "min_brightness": 30.0,
+        "max_brightness": 230.0,
+        "max_dark_fraction": 0.85,
+        "max_bright_fraction": 0.85,
+        "min_vegetation": 0.05
+    }
 }
 
 # Environment specific config, or overwrite of GLOBAL_CONFIG
@@ -45,10 +84,34 @@ def get_config() -> dict:
     config.update(ENV_CONFIG[ENV])
 
     config['ENV'] = ENV
-    config['DEVICE'] = 'cuda' if torch.cuda.is_available() and config['USE_CUDE_IF_AVAILABLE'] else 'cpu'
+    config['PROFILE_ADMIN_TOKEN'] = os.environ.get('PROFILE_ADMIN_TOKEN')
+    if 'PROFILE_SAMPLE_EVERY' in os.environ:
+        config['PROFILE_SAMPLE_EVERY'] = int(os.environ['PROFILE_SAMPLE_EVERY'])
+    config['DATABASE_URL'] = os.environ.get('DATABASE_URL')
+    if 'PREPROCESS_WORKERS' in os.environ:
+        config['PREPROCESS_WORKERS'] = int(os.environ['PREPROCESS_WORKERS'])
+    config['SHADOW_MODEL_PATH'] = os.environ.get('SHADOW_MODEL_PATH')
+    if 'QUALITY_GATE_ENABLED' in os.environ:
+        config['QUALITY_GATE_ENABLED'] = os.environ['QUALITY_GATE_ENABLED'].lower() in ('1', 'true', 'yes')
+    if 'SHADOW_SAMPLE_RATE' in os.environ:
+        config['SHADOW_SAMPLE_RATE'] = float(os.environ['SHADOW_SAMPLE_RATE'])
+    if 'SHADOW_THREADS' in os.environ:
+        config['SHADOW_THREADS'] = int(os.environ['SHADOW_THREADS'])
 
     return config
 
+
+@lru_cache(maxsize=None)
+def get_device() -> str:
+    """
+    Pick the torch device for inference. This imports torch, so it is only
+    called from the inference path and never at config import time.
+    :return: 'cuda' or 'cpu'
+    """
+    import torch
+
+    return 'cuda' if torch.cuda.is_available() and CONFIG['USE_CUDE_IF_AVAILABLE'] else 'cpu'
+
 # load config for import
 CONFIG = get_config()
 
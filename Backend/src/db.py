@@ -0,0 +1,50 @@
+from datetime import date, datetime
+from typing import AsyncIterator, Optional
+
+from sqlalchemy import BigInteger, Date, DateTime, Float, SmallInteger, String, func
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
+
+from config import CONFIG
+
+
+class Base(DeclarativeBase):
+    pass
+
+
+class Prediction(Base):
+    """One served prediction, kept for audits; dashboards read the rollups."""
+    __tablename__ = "predictions"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    class_id: Mapped[int] = mapped_column(SmallInteger, nullable=False)
+    confidence: Mapped[float] = mapped_column(Float, nullable=False)
+    region: Mapped[Optional[str]] = mapped_column(String(64))
+    crop: Mapped[Optional[str]] = mapped_column(String(64))
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False,
+                                                 server_default=func.now(), index=True)
+
+
+class DiseaseDailyRollup(Base):
+    """
+    Prediction counts per day, class, region and crop, folded in as
+    predictions arrive. An untagged region or crop is stored as ''.
+    """
+    __tablename__ = "disease_daily_rollups"
+
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    class_id: Mapped[int] = mapped_column(SmallInteger, primary_key=True)
+    region: Mapped[str] = mapped_column(String(64), primary_key=True, default="")
+    crop: Mapped[str] = mapped_column(String(64), primary_key=True, default="")
+    count: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    confidence_sum: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+
+
+# Analytics are disabled when no database is configured
+async_engine = create_async_engine(CONFIG['DATABASE_URL'], pool_pre_ping=True) if CONFIG['DATABASE_URL'] else None
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False) if async_engine else None
+
+
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    async with AsyncSessionLocal() as session:
+        yield session
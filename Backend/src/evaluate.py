@@ -0,0 +1,193 @@
+"""
+Offline evaluation of model variants on a labelled image set.
+
+The images are decoded and run through get_transforms once, into a
+memory-mapped float32 store keyed by the transform configuration and the
+image set. Later runs with the same key stream batches straight from the
+store, so comparing variants only costs forward passes.
+
+A variant is a transform of the loaded checkpoint, picked by name from
+MODEL_VARIANTS, so the same weights can be compared in fp32, with dynamic
+int8 quantization or in channels_last memory format.
+
+The image set uses the usual one-folder-per-class layout, with folder names
+taken from DISEASE_CLASSES:
+
+    image_dir/Healthy Wheat/0001.jpg
+    image_dir/Wheat Scab/0002.jpg
+"""
+import hashlib
+import json
+import os
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+import torch
+from PIL import Image
+
+from labels import DISEASE_CLASSES
+from predict import IMAGE_SIZE, get_transforms
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+
+
+class _ChannelsLast(torch.nn.Module):
+    """Runs a channels_last model on NHWC-strided inputs."""
+    def __init__(self, model: torch.nn.Module):
+        super().__init__()
+        self.model = model.to(memory_format=torch.channels_last)
+
+    def forward(self, x):
+        return self.model(x.contiguous(memory_format=torch.channels_last))
+
+
+def _dynamic_int8(model: torch.nn.Module, device: str) -> torch.nn.Module:
+    # Only the Linear layers are quantized (the classifier head of ResNet18);
+    # dynamically quantized kernels only exist on the CPU
+    if device != 'cpu':
+        raise ValueError("The dynamic-int8 variant runs on the CPU only")
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+MODEL_VARIANTS: Dict[str, Callable[[torch.nn.Module, str], torch.nn.Module]] = {
+    "fp32": lambda model, device: model,
+    "dynamic-int8": _dynamic_int8,
+    "channels_last": lambda model, device: _ChannelsLast(model),
+}
+
+
+def apply_variant(model: torch.nn.Module, variant: str, device: str = 'cpu') -> torch.nn.Module:
+    """
+    Transform a loaded eval-mode model into `variant`, see MODEL_VARIANTS.
+    """
+    if variant not in MODEL_VARIANTS:
+        raise ValueError(f"Unknown variant {variant!r}, expected one of {', '.join(MODEL_VARIANTS)}")
+    return MODEL_VARIANTS[variant](model, device).eval()
+
+
+def list_labelled_images(image_dir: str) -> List[Tuple[str, int]]:
+    """
+    Collect (path, class_id) pairs; folders that are not a known class are skipped.
+    """
+    class_ids = {disease: class_id for class_id, disease in enumerate(DISEASE_CLASSES)}
+    samples = []
+    for folder in sorted(os.listdir(image_dir)):
+        folder_path = os.path.join(image_dir, folder)
+        if not os.path.isdir(folder_path):
+            continue
+        if folder not in class_ids:
+            print(f"Skipping folder {folder!r}: not in DISEASE_CLASSES")
+            continue
+        for name in sorted(os.listdir(folder_path)):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                samples.append((os.path.join(folder_path, name), class_ids[folder]))
+    return samples
+
+
+def cache_key(samples: List[Tuple[str, int]], image_size: int) -> str:
+    """
+    Hash of the transform configuration and of every image's path, size and
+    mtime, so a changed transform or image set gets its own store.
+    """
+    digest = hashlib.sha256(repr(get_transforms(image_size)).encode())
+    for path, class_id in samples:
+        stat = os.stat(path)
+        digest.update(f"{path}|{stat.st_size}|{stat.st_mtime_ns}|{class_id}\n".encode())
+    return digest.hexdigest()[:16]
+
+
+def load_tensor_store(image_dir: str, cache_dir: str, image_size: int = IMAGE_SIZE,
+                      rebuild: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Return the preprocessed images (memory-mapped, N x 3 x S x S float32) and
+    their labels, building the store first if needed.
+    """
+    samples = list_labelled_images(image_dir)
+    if not samples:
+        raise ValueError(f"No labelled images found in {image_dir}")
+
+    store_dir = os.path.join(cache_dir, cache_key(samples, image_size))
+    images_path = os.path.join(store_dir, 'images.npy')
+    labels_path = os.path.join(store_dir, 'labels.npy')
+    meta_path = os.path.join(store_dir, 'meta.json')
+    shape = (len(samples), 3, image_size, image_size)
+
+    # meta.json is written last and marks a complete store
+    if rebuild or not os.path.exists(meta_path):
+        os.makedirs(store_dir, exist_ok=True)
+        transform = get_transforms(image_size)
+        images = np.lib.format.open_memmap(images_path, mode='w+', dtype=np.float32, shape=shape)
+        start = time.perf_counter()
+        for index, (path, _) in enumerate(samples):
+            image = Image.open(path).convert('RGB')
+            images[index] = transform(image).numpy()
+        images.flush()
+        del images
+
+        np.save(labels_path, np.array([class_id for _, class_id in samples], dtype=np.int64))
+        with open(meta_path, 'w') as f:
+            json.dump({
+                "image_dir": os.path.abspath(image_dir),
+                "count": len(samples),
+                "image_size": image_size,
+                "transforms": repr(get_transforms(image_size)),
+                "build_seconds": round(time.perf_counter() - start, 3),
+            }, f, indent=4)
+
+    # Copy-on-write mapping: pages are read lazily and torch gets a writable array
+    images = np.load(images_path, mmap_mode='c')
+    labels = np.load(labels_path)
+    return images, labels
+
+
+def evaluate_model(model: torch.nn.Module, images: np.ndarray, labels: np.ndarray,
+                   device: str = 'cpu', batch_size: int = 64) -> Dict[str, Any]:
+    """
+    Stream the store through `model` and report accuracy, the confusion
+    matrix over DISEASE_CLASSES and forward-pass throughput.
+    """
+    num_classes = len(DISEASE_CLASSES)
+    confusion = np.zeros((num_classes, num_classes), dtype=np.int64)
+    device = torch.device(device)
+    model.eval()
+
+    forward_seconds = 0.0
+    with torch.no_grad():
+        for start in range(0, len(images), batch_size):
+            batch = torch.from_numpy(images[start:start + batch_size]).to(device)
+            begin = time.perf_counter()
+            predictions = model(batch).argmax(dim=1)
+            if device.type == 'cuda':
+                torch.cuda.synchronize()
+            forward_seconds += time.perf_counter() - begin
+            np.add.at(confusion, (labels[start:start + batch_size], predictions.cpu().numpy()), 1)
+
+    support = confusion.sum(axis=1)
+    predicted = confusion.sum(axis=0)
+    correct = np.diag(confusion)
+
+    per_class = {}
+    for class_id, disease in enumerate(DISEASE_CLASSES):
+        if not support[class_id]:
+            continue
+        row = confusion[class_id].copy()
+        row[class_id] = 0
+        confused_with = [
+            {"disease": DISEASE_CLASSES[other], "count": int(row[other])}
+            for other in np.argsort(row)[::-1][:3] if row[other]
+        ]
+        per_class[disease] = {
+            "support": int(support[class_id]),
+            "recall": round(float(correct[class_id] / support[class_id]), 4),
+            "precision": round(float(correct[class_id] / predicted[class_id]), 4) if predicted[class_id] else 0.0,
+            "confused_with": confused_with,
+        }
+
+    return {
+        "images": int(len(images)),
+        "accuracy": round(float(correct.sum() / len(images)), 4),
+        "images_per_s": round(len(images) / forward_seconds, 1) if forward_seconds else None,
+        "per_class": per_class,
+        "confusion": confusion.tolist(),
+    }
@@ -0,0 +1,115 @@
+"""
+Measure the import time of each backend entry point in a fresh interpreter
+and check it against a budget.
+
+    python importtime.py            # report
+    python importtime.py --check    # exit 1 when an entry point is over budget
+
+Non-inference entry points must also never import torch or torchvision;
+that is checked on every run regardless of timing.
+"""
+import argparse
+import ast
+import json
+import os
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def module_imports(path: str) -> str:
+    """
+    The top-level import statements of a script that can't be imported on
+    its own, e.g. alembic/env.py, which runs the migrations on import.
+    """
+    with open(path) as f:
+        source = f.read()
+    return "\n".join(ast.get_source_segment(source, node) for node in ast.parse(source).body
+                     if isinstance(node, (ast.Import, ast.ImportFrom)))
+
+
+# Import statements of each entry point, as its launcher would run them
+ENTRY_POINTS = {
+    # uvicorn main:app; the model is loaded later, in lifespan
+    "web": "import main",
+    # python cli.py ...
+    "cli": "import cli",
+    # alembic upgrade head, read from alembic/env.py so it can't drift
+    "migrations": module_imports(os.path.join(HERE, "alembic", "env.py")),
+}
+
+# Budget in milliseconds per entry point
+IMPORT_BUDGET_MS = {
+    "web": 1500,
+    "cli": 300,
+    "migrations": 800,
+}
+
+HEAVY_MODULES = ["torch", "torchvision"]
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+exec({statements!r})
+elapsed = (time.perf_counter() - start) * 1000
+print(json.dumps({{
+    "ms": elapsed,
+    "heavy": [m for m in {heavy!r} if m in sys.modules],
+}}))
+"""
+
+
+def measure(statements: str, repeat: int = 3) -> dict:
+    """
+    Run the import `statements` in `repeat` fresh interpreters.
+    :return: dict with the best import time in ms and the heavy modules
+        loaded, or with the error when the imports fail
+    """
+    code = _PROBE.format(statements=statements, heavy=HEAVY_MODULES)
+    runs = []
+    for _ in range(repeat):
+        try:
+            out = subprocess.run([sys.executable, "-c", code], cwd=HERE,
+                                 capture_output=True, text=True, check=True)
+        except subprocess.CalledProcessError as e:
+            lines = e.stderr.strip().splitlines()
+            return {"error": lines[-1] if lines else f"exit status {e.returncode}"}
+        runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    return {
+        "ms": round(min(run["ms"] for run in runs), 1),
+        "heavy": runs[0]["heavy"],
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--check", action="store_true", help="fail when an entry point is over budget")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    failures = []
+    for name, statements in ENTRY_POINTS.items():
+        result = measure(statements, args.repeat)
+        budget = IMPORT_BUDGET_MS[name]
+        if "error" in result:
+            print(f"{name:<12}     FAIL     {result['error']}")
+            failures.append(f"{name} failed to import: {result['error']}")
+            continue
+        print(f"{name:<12}{result['ms']:>9.1f} ms  (budget {budget} ms)"
+              + (f"  imports {', '.join(result['heavy'])}" if result['heavy'] else ""))
+
+        if result['heavy']:
+            failures.append(f"{name} imports {', '.join(result['heavy'])}")
+        if result['ms'] > budget:
+            failures.append(f"{name} took {result['ms']} ms, budget is {budget} ms")
+
+    if args.check and failures:
+        for failure in failures:
+            print(f"FAIL: {failure}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
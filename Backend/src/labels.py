@@ -0,0 +1,51 @@
+"""
+Class labels of the crop disease model. Kept free of torch so tools that only
+need the label list do not pay for importing it.
+"""
+
+# Class labels mapping, indexed by the model's output logits
+DISEASE_CLASSES = [
+    "American Bollworm on Cotton",
+    "Anthracnose on Cotton",
+    "Army worm",
+    "Bacterial Blight",
+    "Brownspot",
+    "Common Rust",
+    "Cotton Curl Virus",
+    "Flag Smut",
+    "Gray_Leaf_Spot",
+    "Healthy",
+    "Healthy Maize",
+    "Healthy Wheat",
+    "Healthy cotton",
+    "Leaf Curl",
+    "Leaf smut",
+    "Mosaic sugarcane",
+    "RedRot sugarcane",
+    "Rice Blast",
+    "Sugarcane healthy",
+    "Tungro",
+    "Wheat Brown leaf Rust",
+    "Wheat Stem Fly",
+    "Wheat aphid",
+    "Wheat Black Rust",
+    "Wheat leaf rust",
+    "Wheat midge",
+    "Wheat powdery mildew",
+    "Wheat Scab",
+    "Wheat_Yellow_Rust",
+    "Wilt",
+    "Yellow Rust Sugarcane",
+    "bacterial blight cotton",
+    "bollrot on Cotton",
+    "bollworm on cotton",
+    "cotton mealy bug",
+    "cotton whitefly",
+    "jassid on cotton",
+    "maize ear rot",
+    "maize fall armyworm",
+    "maize stem borer",
+    "pink bollworm in cotton",
+    "red cotton bug",
+    "mites in cotton"
+]
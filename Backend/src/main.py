@@ -1,51 +1,99 @@
-from pathlib import Path
+from datetime import date, timedelta
+from typing import Optional
+import asyncio
 import os
+import uuid
 
-from dotenv import load_dotenv
-from fastapi import Depends, FastAPI, HTTPException, Request, UploadFile, File
-from sqlalchemy import text
-from sqlalchemy.exc import OperationalError
-from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import BackgroundTasks, Depends, FastAPI, Form, HTTPException, Query, Request, UploadFile, File
 from contextlib import asynccontextmanager
-# from db import Base, async_engine, get_async_db
-
-import torch
-from joblib import load
-from schema import InferenceInput, InferenceOutput
-from model import Model
-from predict import predict_disease
-from config import CONFIG
+
+# torch, torchvision and the model are imported lazily on the inference
+# path (load_package / predict_endpoint) so importing this module stays cheap
+from schema import InferenceInput, InferenceOutput, StatsResponse
+from config import CONFIG, get_device
+from solutions import CROP_DISEASE_SOLUTIONS
+import db
+from analytics import disease_stats, record_prediction
 from tempfile import NamedTemporaryFile
 import shutil
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse
+from profiling import RequestProfiler
+from preprocess_pool import PoolBusyError, PreprocessPool
+from quality import ImageQualityError, QualityStats
 
-load_dotenv(Path(__file__).parent.parent / '.env')
+def load_package(preprocess_pool: Optional[PreprocessPool] = None) -> dict:
+    """
+    Load the fine-tuned model and warm up the inference path, including the
+    preprocessing workers when the pool is enabled.
+    Runs in a worker thread so liveness checks are answered meanwhile.
+    """
+    from model import load_model
+    from predict import warmup_model
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    # Load the model
-    model = Model(num_classes=42)
-    
-    # Load the state dict from the fine-tuned ResNet18
-    state_dict = torch.load(CONFIG['MODEL_PATH'], map_location=torch.device(CONFIG['DEVICE']))
-    
-    # Add 'model.' prefix to keys since our Model class wraps ResNet18 in self.model
-    prefixed_state_dict = {'model.' + k: v for k, v in state_dict.items()}
-    
-    model.load_state_dict(prefixed_state_dict)
-    model.eval()
+    device = get_device()
+    model = load_model(CONFIG['MODEL_PATH'], device)
 
     # add model and other preprocess tools too app state
-    app.package = {
+    package = {
         "model": model,
-        "device": CONFIG['DEVICE']  # Also add device to package
+        "device": device,  # Also add device to package
+        "cam_size": CONFIG['CAM_SIZE'],
+        "quality_thresholds": CONFIG['QUALITY_THRESHOLDS'] if CONFIG['QUALITY_GATE_ENABLED'] else None
     }
+
+    # Pay for allocator growth, kernel selection and thread-pool spin-up
+    # before the first real request does
+    package["warmup_ms"] = warmup_model(package, CONFIG['WARMUP_BATCH_SIZES'], CONFIG['WARMUP_ITERATIONS'])
+
+    # Candidate checkpoint evaluated on sampled live traffic, in its own
+    # process. Best effort: a broken candidate must not keep us from serving
+    if CONFIG['SHADOW_MODEL_PATH']:
+        from shadow import ShadowEvaluator
+        shadow = ShadowEvaluator(
+            CONFIG['SHADOW_MODEL_PATH'], device, CONFIG['SHADOW_SAMPLE_RATE'],
+            CONFIG['SHADOW_MAX_PENDING'], CONFIG['SHADOW_THREADS'],
+            name=os.path.basename(CONFIG['SHADOW_MODEL_PATH']),
+        )
+        try:
+            shadow.warmup()
+            package["shadow"] = shadow
+        except Exception as e:
+            print(f"Error loading shadow model, serving without it: {str(e)}")
+            shadow.close()
+
+    if preprocess_pool is not None:
+        preprocess_pool.warmup()
+    package["ready"] = True
+    return package
+
+async def load_package_in_background(app: FastAPI):
+    try:
+        app.package = await asyncio.to_thread(load_package, app.preprocess_pool)
+    except Exception as e:
+        print(f"Error loading model: {str(e)}")
+        app.package = {"ready": False, "error": str(e)}
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Not ready until the model is loaded and warmed up, see /readyz
+    app.package = {"ready": False}
+    app.preprocess_pool = PreprocessPool.from_config(CONFIG)
+    loader = asyncio.create_task(load_package_in_background(app))
     yield
 
     # Clean up the model
-    pass
+    loader.cancel()
+    if app.preprocess_pool is not None:
+        app.preprocess_pool.close()
+    if app.package.get("shadow") is not None:
+        app.package["shadow"].close()
+    if db.async_engine is not None:
+        await db.async_engine.dispose()
 
 app = FastAPI(lifespan=lifespan)
+profiler = RequestProfiler.from_config(CONFIG)
+quality_stats = QualityStats()
 
 # Add CORS middleware
 app.add_middleware(
@@ -65,261 +113,189 @@ app.add_middleware(
 async def root():
     return {"message": "This is a FastAPI app that uses CoinGecko API"}
 
+@app.get("/healthz")
+async def healthz():
+    """Liveness: the process is up and serving HTTP."""
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz():
+    """Readiness: the model is loaded and the inference path is warmed up."""
+    if not app.package.get("ready"):
+        detail = app.package.get("error", "Model is loading")
+        raise HTTPException(status_code=503, detail=detail)
+    return {"status": "ready", "warmup_ms": app.package["warmup_ms"]}
+
 @app.post('/predict', response_model=InferenceOutput)
-async def predict_endpoint(request: Request, file: UploadFile = File(...)):
+async def predict_endpoint(request: Request, background_tasks: BackgroundTasks,
+                           file: UploadFile = File(...),
+                           # Bounded like the region/crop columns, see db.Prediction
+                           region: Optional[str] = Form(None, max_length=64),
+                           crop: Optional[str] = Form(None, max_length=64),
+                           cam: bool = False):
+    if not app.package.get("ready"):
+        raise HTTPException(status_code=503, detail="Model is not ready")
+    from predict import predict_image
+
+    # Profile when an admin asked for it or the request is sampled
+    profile_id = uuid.uuid4().hex if profiler.should_profile(request) else None
+
     # Create a temporary file to store the uploaded image
+    temp_file_path = None
     try:
-        with NamedTemporaryFile(delete=False, suffix='.jpg') as temp_file:
-            # Save the uploaded file to a temporary location
-            shutil.copyfileobj(file.file, temp_file)
-            temp_file_path = temp_file.name
-        
-        # Make sure to close the file
-        file.file.close()
-        
-        # Process the image using the temporary file path
-        disease, confidence = predict_disease(temp_file_path, app.package)
+        if app.preprocess_pool is not None and profile_id is None:
+            # Decode and preprocess in the worker pool, which hands the
+            # tensor over through shared memory
+            result = await app.preprocess_pool.predict(await file.read(), app.package, with_cam=cam)
+        else:
+            with NamedTemporaryFile(delete=False, suffix='.jpg') as temp_file:
+                # Save the uploaded file to a temporary location
+                shutil.copyfileobj(file.file, temp_file)
+                temp_file_path = temp_file.name
+            
+            # Make sure to close the file
+            file.file.close()
+            
+            # Process the image using the temporary file path, under
+            # torch.profiler if requested
+            if profile_id is not None:
+                with profiler.profile(profile_id) as timer:
+                    result = predict_image(temp_file_path, app.package, with_cam=cam, timer=timer)
+            else:
+                result = predict_image(temp_file_path, app.package, with_cam=cam)
+
+        quality_stats.record(result.get("quality"))
+        disease, confidence = result["disease"], result["confidence"]
         
         # Create response from the prediction results
         response = {
             "disease": disease,
             "confidence": confidence,
+            "heatmap": result.get("heatmap"),
+            "profile_id": profile_id,
         }
         
-        CropDiseaseSolution = {
-            "American Bollworm on Cotton": {
-                "Cause": "Larvae of Helicoverpa armigera feeding on cotton bolls.",
-                "Peak Season": "Summer and early monsoon.",
-                "Remedy": "Use pheromone traps and insecticides like Spinosad or Bacillus thuringiensis."
-            },
-            "Anthracnose on Cotton": {
-                "Cause": "Fungal infection caused by Colletotrichum species.",
-                "Peak Season": "High humidity periods, usually post-monsoon.",
-                "Remedy": "Apply copper-based fungicides and ensure good field drainage."
-            },
-            "Army worm": {
-                "Cause": "Larvae of Spodoptera species attacking foliage.",
-                "Peak Season": "Rainy season and post-monsoon.",
-                "Remedy": "Use neem oil or Bacillus thuringiensis-based biopesticides."
-            },
-            "Bacterial Blight": {
-                "Cause": "Xanthomonas citri bacteria spreading through infected seeds and water.",
-                "Peak Season": "Warm and humid conditions.",
-                "Remedy": "Use resistant varieties and copper-based fungicides."
-            },
-            "Brownspot": {
-                "Cause": "Drechslera oryzae fungus causing lesions on leaves.",
-                "Peak Season": "High humidity and excessive nitrogen fertilization.",
-                "Remedy": "Use balanced fertilization and Mancozeb fungicide spray."
-            },
-            "Common Rust": {
-                "Cause": "Puccinia sorghi fungus spreading through wind-borne spores.",
-                "Peak Season": "Warm, humid conditions during late summer.",
-                "Remedy": "Plant rust-resistant varieties and use sulfur-based fungicides."
-            },
-            "Cotton Curl Virus": {
-                "Cause": "Cotton leaf curl virus transmitted by whiteflies.",
-                "Peak Season": "Warm seasons with high whitefly populations.",
-                "Remedy": "Control whitefly populations and plant resistant varieties."
-            },
-            "Flag Smut": {
-                "Cause": "Urocystis agropyri fungus affecting wheat seedlings.",
-                "Peak Season": "Cool and moist conditions during early growth.",
-                "Remedy": "Use disease-free seeds and treat seeds with fungicides before planting."
-            },
-            "Gray_Leaf_Spot": {
-                "Cause": "Fungal infection caused by Cercospora species.",
-                "Peak Season": "Late summer and early autumn.",
-                "Remedy": "Use strobilurin-based fungicides and improve air circulation in the field."
-            },
-            "Healthy": {
-                "Cause": "No disease detected.",
-                "Peak Season": "N/A",
-                "Remedy": "Crop is healthy, no diagnosis required."
-            },
-            "Healthy Maize": {
-                "Cause": "No disease detected.",
-                "Peak Season": "N/A",
-                "Remedy": "Crop is healthy, no diagnosis required."
-            },
-            "Healthy Wheat": {
-                "Cause": "No disease detected.",
-                "Peak Season": "N/A",
-                "Remedy": "Crop is healthy, no diagnosis required."
-            },
-            "Healthy cotton": {
-                "Cause": "No disease detected.",
-                "Peak Season": "N/A",
-                "Remedy": "Crop is healthy, no diagnosis required."
-            },
-            "Leaf Curl": {
-                "Cause": "Begomovirus transmitted by whiteflies.",
-                "Peak Season": "Monsoon and early winter.",
-                "Remedy": "Control whiteflies, as they spread the virus, and use resistant plant varieties."
-            },
-            "Leaf smut": {
-                "Cause": "Fungal infection caused by Entyloma oryzae.",
-                "Peak Season": "Humid conditions in early growth stages.",
-                "Remedy": "Use seed treatment with Thiram or Captan before sowing."
-            },
-            "Mosaic sugarcane": {
-                "Cause": "Sugarcane mosaic virus (SCMV) spread by aphids.",
-                "Peak Season": "Monsoon and post-monsoon.",
-                "Remedy": "Use virus-free planting material and remove infected plants."
-            },
-            "RedRot sugarcane": {
-                "Cause": "Fungal disease caused by Colletotrichum falcatum.",
-                "Peak Season": "Warm and humid conditions.",
-                "Remedy": "Apply Trichoderma viride-based biofungicides and remove infected stalks."
-            },
-            "Rice Blast": {
-                "Cause": "Fungal infection caused by Magnaporthe oryzae.",
-                "Peak Season": "High humidity with temperature between 24-28°C.",
-                "Remedy": "Use resistant varieties and apply fungicides like Tricyclazole."
-            },
-            "Sugarcane healthy": {
-                "Cause": "No disease detected.",
-                "Peak Season": "N/A",
-                "Remedy": "Crop is healthy, no diagnosis required."
-            },
-            "Tungro": {
-                "Cause": "Rice tungro virus transmitted by green leafhoppers.",
-                "Peak Season": "Rainy season with high humidity.",
-                "Remedy": "Control leafhopper vectors and use resistant rice varieties."
-            },
-            "Wheat Brown leaf Rust": {
-                "Cause": "Fungal infection caused by Puccinia triticina.",
-                "Peak Season": "Cool, moist conditions in spring.",
-                "Remedy": "Use resistant varieties and apply propiconazole-based fungicides."
-            },
-            "Wheat Stem Fly": {
-                "Cause": "Infestation by Atherigona species damaging wheat stems.",
-                "Peak Season": "Early growth stage during warm weather.",
-                "Remedy": "Early sowing and application of insecticides like imidacloprid."
-            },
-            "Wheat aphid": {
-                "Cause": "Infestation by various aphid species sucking sap from wheat plants.",
-                "Peak Season": "Cool, dry weather during tillering and heading stages.",
-                "Remedy": "Apply neem-based insecticides or introduce natural predators."
-            },
-            "Wheat Black Rust": {
-                "Cause": "Fungal infection caused by Puccinia graminis.",
-                "Peak Season": "Late winter and early spring.",
-                "Remedy": "Apply triazole fungicides and use rust-resistant wheat varieties."
-            },
-            "Wheat leaf rust": {
-                "Cause": "Fungal infection caused by Puccinia recondita.",
-                "Peak Season": "Mild temperatures and high humidity during growth.",
-                "Remedy": "Use resistant varieties and apply azoxystrobin-based fungicides."
-            },
-            "Wheat midge": {
-                "Cause": "Infestation by Sitodiplosis mosellana larvae damaging wheat kernels.",
-                "Peak Season": "Warm evenings during wheat heading.",
-                "Remedy": "Time planting to avoid peak midge periods and use insecticides if necessary."
-            },
-            "Wheat powdery mildew": {
-                "Cause": "Fungal infection caused by Blumeria graminis.",
-                "Peak Season": "Cool, humid conditions with dense crop canopy.",
-                "Remedy": "Apply sulfur or triazole fungicides and ensure proper spacing."
-            },
-            "Wheat Scab": {
-                "Cause": "Fungal infection caused by Fusarium species.",
-                "Peak Season": "Wet conditions during flowering.",
-                "Remedy": "Use resistant varieties and apply triazole fungicides during flowering."
-            },
-            "Wheat_Yellow_Rust": {
-                "Cause": "Fungal infection caused by Puccinia striiformis.",
-                "Peak Season": "Cool and moist conditions in early spring.",
-                "Remedy": "Use resistant varieties and apply strobilurin fungicides."
-            },
-            "Wilt": {
-                "Cause": "Fungal infection caused by Fusarium oxysporum.",
-                "Peak Season": "Hot and dry conditions.",
-                "Remedy": "Use disease-free seeds and practice crop rotation."
-            },
-            "Yellow Rust Sugarcane": {
-                "Cause": "Fungal infection caused by Puccinia kuehnii.",
-                "Peak Season": "Cool and humid conditions.",
-                "Remedy": "Use resistant varieties and sulfur fungicides."
-            },
-            "bacterial blight cotton": {
-                "Cause": "Xanthomonas axonopodis pv. malvacearum bacteria infecting cotton plants.",
-                "Peak Season": "Rainy season with high humidity.",
-                "Remedy": "Use resistant varieties and copper oxychloride sprays."
-            },
-            "bollrot on Cotton": {
-                "Cause": "Fungal pathogens affecting cotton bolls, primarily Rhizopus nigricans.",
-                "Peak Season": "Rainy season with high humidity.",
-                "Remedy": "Apply carbendazim-based fungicides and improve field drainage."
-            },
-            "bollworm on cotton": {
-                "Cause": "Various species of bollworm larvae including Helicoverpa and Pectinophora.",
-                "Peak Season": "Flowering and fruiting stages during warm weather.",
-                "Remedy": "Use Bt cotton varieties and integrated pest management techniques."
-            },
-            "cotton mealy bug": {
-                "Cause": "Phenacoccus solenopsis insects covering cotton plants with waxy secretions.",
-                "Peak Season": "Hot and dry conditions.",
-                "Remedy": "Apply insecticidal soaps and release natural predators like ladybugs."
-            },
-            "cotton whitefly": {
-                "Cause": "Bemisia tabaci insects sucking sap and transmitting viruses.",
-                "Peak Season": "Warm and dry conditions.",
-                "Remedy": "Use yellow sticky traps and neem oil sprays."
-            },
-            "jassid on cotton": {
-                "Cause": "Amrasca biguttula biguttula insects causing leaf curling and yellowing.",
-                "Peak Season": "Hot and humid conditions.",
-                "Remedy": "Apply imidacloprid or acetamiprid insecticides."
-            },
-            "maize ear rot": {
-                "Cause": "Fungal infection caused by Fusarium species.",
-                "Peak Season": "High moisture conditions during grain filling.",
-                "Remedy": "Harvest early and ensure proper drying of maize cobs."
-            },
-            "maize fall armyworm": {
-                "Cause": "Spodoptera frugiperda larvae feeding on maize leaves.",
-                "Peak Season": "Warm and humid conditions.",
-                "Remedy": "Use biological control like parasitoid wasps and neem oil sprays."
-            },
-            "maize stem borer": {
-                "Cause": "Chilo partellus larvae boring into maize stems.",
-                "Peak Season": "Warm weather during vegetative growth.",
-                "Remedy": "Apply carbofuran granules in whorls and use resistant varieties."
-            },
-            "pink bollworm in cotton": {
-                "Cause": "Pectinophora gossypiella larvae burrowing into cotton bolls.",
-                "Peak Season": "Warm and dry conditions during boll formation.",
-                "Remedy": "Use pheromone traps and Bt cotton varieties."
-            },
-            "red cotton bug": {
-                "Cause": "Dysdercus cingulatus sucking sap from cotton plants.",
-                "Peak Season": "Post-monsoon and dry weather.",
-                "Remedy": "Use insecticides like Malathion and remove plant debris after harvest."
-            },
-            "mites in cotton": {
-                "Cause": "Tetranychus urticae and related species damaging cotton leaves.",
-                "Peak Season": "Hot and dry conditions.",
-                "Remedy": "Apply sulfur-based miticides and maintain field moisture."
-            }
-        }
         # Add disease solution if available
-        if disease in CropDiseaseSolution:
-            response["solution"] = CropDiseaseSolution[disease]
-            
-        # Clean up the temporary file
-        os.unlink(temp_file_path)
+        if disease in CROP_DISEASE_SOLUTIONS:
+            response["solution"] = CROP_DISEASE_SOLUTIONS[disease]
+
+        # Store the prediction and update the rollups after responding
+        background_tasks.add_task(record_prediction, disease, confidence, region, crop)
             
         return response
+    except PoolBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except ImageQualityError as e:
+        # Skip the model and ask for a better photo. FastAPI's own validation
+        # errors are 422s too; clients tell them apart by detail.code
+        quality_stats.record(e.report)
+        raise HTTPException(status_code=422, detail={"code": "retake_photo",
+                                                     "message": "Please retake the photo", **e.report})
     except Exception as e:
         print(f"Error during prediction: {str(e)}")
-        # Clean up temp file if it exists
-        if 'temp_file_path' in locals():
+        raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
+    finally:
+        # Clean up the temporary file
+        if temp_file_path is not None:
             try:
                 os.unlink(temp_file_path)
-            except:
+            except OSError:
                 pass
+
+@app.post('/predict/tensor', response_model=InferenceOutput)
+async def predict_tensor_endpoint(request: Request, background_tasks: BackgroundTasks,
+                                  region: Optional[str] = Query(None, max_length=64),
+                                  crop: Optional[str] = Query(None, max_length=64),
+                                  cam: bool = False):
+    """
+    Predict from a pre-processed binary image (see tensor_ingest for the
+    layout), skipping decode and resize.
+    """
+    if not app.package.get("ready"):
+        raise HTTPException(status_code=503, detail="Model is not ready")
+    from predict import predict_batch
+    from tensor_ingest import MAX_PAYLOAD_BYTES, parse_tensor_payload
+
+    # Refuse oversized bodies from the header instead of buffering them first
+    content_length = request.headers.get("content-length")
+    if content_length is None or not content_length.isdigit():
+        raise HTTPException(status_code=411, detail="Content-Length required")
+    if int(content_length) > MAX_PAYLOAD_BYTES:
+        raise HTTPException(status_code=413, detail=f"Payload larger than {MAX_PAYLOAD_BYTES} bytes")
+
+    payload = await request.body()
+    try:
+        image_tensor = parse_tensor_payload(payload)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid tensor payload: {str(e)}")
+
+    try:
+        result = predict_batch(image_tensor, app.package, with_cam=cam)[0]
+    except Exception as e:
+        print(f"Error during prediction: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
 
+    disease, confidence = result["disease"], result["confidence"]
+    response = {
+        "disease": disease,
+        "confidence": confidence,
+        "heatmap": result.get("heatmap"),
+    }
+    if disease in CROP_DISEASE_SOLUTIONS:
+        response["solution"] = CROP_DISEASE_SOLUTIONS[disease]
+
+    background_tasks.add_task(record_prediction, disease, confidence, region, crop)
+    return response
+
+@app.get('/pipeline/stats')
+async def pipeline_stats():
+    """Ring occupancy and per-stage throughput of the preprocessing pool."""
+    if app.preprocess_pool is None:
+        return {"enabled": False}
+    return {"enabled": True, **app.preprocess_pool.stats()}
+
+@app.get('/shadow/stats')
+async def shadow_stats():
+    """Latency and top-1 agreement of the shadow candidate with the serving model."""
+    shadow = app.package.get("shadow")
+    if shadow is None:
+        return {"enabled": False}
+    return {"enabled": True, **shadow.stats()}
+
+@app.get('/quality/stats')
+async def quality_gate_stats():
+    """Quality gate outcomes and the model compute saved by rejected uploads."""
+    forward_ms = app.package.get("warmup_ms", {}).get(1)
+    return {"enabled": CONFIG['QUALITY_GATE_ENABLED'], **quality_stats.summary(forward_ms)}
+
+@app.get('/stats', response_model=StatsResponse)
+async def stats_endpoint(start: Optional[date] = None, end: Optional[date] = None,
+                         region: Optional[str] = Query(None, max_length=64),
+                         crop: Optional[str] = Query(None, max_length=64)):
+    """
+    Disease counts by day, class and region, read from the daily rollups only.
+    Defaults to the last 30 days.
+    """
+    if db.AsyncSessionLocal is None:
+        raise HTTPException(status_code=503, detail="Analytics database is not configured")
+
+    end = end or date.today()
+    start = start or end - timedelta(days=30)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+
+    async with db.AsyncSessionLocal() as session:
+        stats = await disease_stats(session, start, end, region=region, crop=crop)
+    return {"start": start, "end": end, "stats": stats}
+
 
+@app.get('/profiles/{profile_id}')
+async def get_profile(request: Request, profile_id: str):
+    """Fetch the chrome trace (with stage timings) of a profiled request. Admin only."""
+    if not profiler.is_admin(request):
+        raise HTTPException(status_code=403, detail="Admin token required")
 
+    path = profiler.store.get(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail=f"Profile {profile_id} not found")
+    return FileResponse(path, media_type="application/json")
@@ -7,11 +7,13 @@ class Model(nn.Module):
     Model class using ResNet18 architecture for crop disease classification.
     This matches the model architecture from your notebook.
     """
-    def __init__(self, num_classes=42):  # Change from 30 to 42 to match pre-trained weights
+    def __init__(self, num_classes=42, pretrained=True):  # Change from 30 to 42 to match pre-trained weights
         super(Model, self).__init__()
         
-        # Load the pretrained ResNet18 model
-        self.model = resnet18(pretrained=True)
+        # Load the pretrained ResNet18 model. Pass pretrained=False when a
+        # fine-tuned state dict is loaded right after, to skip fetching and
+        # initialising ImageNet weights that get overwritten anyway
+        self.model = resnet18(pretrained=pretrained)
         
         # Replace the final fully connected layer with a new one
         # The input features to the final layer are 512 for ResNet18
@@ -20,4 +22,35 @@ class Model(nn.Module):
         
     def forward(self, x):
         """Forward pass through the network"""
-        return self.model(x)
\ No newline at end of file
+        return self.model(x)
+
+    def forward_with_features(self, x):
+        """
+        Forward pass that also returns the final conv activations
+        (N x 512 x 7 x 7), which class activation maps are built from.
+        Same computation as forward, just split before the pooling layer.
+        """
+        m = self.model
+        x = m.maxpool(m.relu(m.bn1(m.conv1(x))))
+        features = m.layer4(m.layer3(m.layer2(m.layer1(x))))
+        logits = m.fc(torch.flatten(m.avgpool(features), 1))
+        return logits, features
+
+
+def load_model(path, device, num_classes=42):
+    """
+    Load a fine-tuned ResNet18 checkpoint (state dict saved from the bare
+    ResNet18) into an eval-mode Model on `device`.
+    """
+    # The ImageNet weights are replaced by the state dict below
+    model = Model(num_classes=num_classes, pretrained=False)
+
+    # Load the state dict from the fine-tuned ResNet18
+    state_dict = torch.load(path, map_location=torch.device(device))
+
+    # Add 'model.' prefix to keys since our Model class wraps ResNet18 in self.model
+    prefixed_state_dict = {'model.' + k: v for k, v in state_dict.items()}
+
+    model.load_state_dict(prefixed_state_dict)
+    model.eval()
+    return model
@@ -3,104 +3,195 @@ from PIL import Image
 import torchvision.transforms as transforms
 import numpy as np
 import os
-from typing import Tuple, Dict, Any
+import time
+from typing import Tuple, Dict, Any, List, Optional
+
+from labels import DISEASE_CLASSES
+from profiling import NULL_TIMER, StageTimer
+from quality import ImageQualityError, check_image_quality
+from saliency import class_activation_maps, encode_heatmap
+
+# Input resolution and ImageNet normalization the model was fine-tuned with
+IMAGE_SIZE = 224
+NORMALIZE_MEAN = [0.485, 0.456, 0.406]
+NORMALIZE_STD = [0.229, 0.224, 0.225]
 
 # Define the transforms for preprocessing input images
-def get_transforms():
+def get_transforms(image_size: int = IMAGE_SIZE):
     """
     Returns the transformations needed to preprocess images for the model
     """
     return transforms.Compose([
-        transforms.Resize((224, 224)),
+        transforms.Resize((image_size, image_size)),
         transforms.ToTensor(),
-        transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225])
+        transforms.Normalize(mean=NORMALIZE_MEAN, std=NORMALIZE_STD)
     ])
 
-# Class labels mapping
-DISEASE_CLASSES = [
-    "American Bollworm on Cotton",
-    "Anthracnose on Cotton",
-    "Army worm",
-    "Bacterial Blight",
-    "Brownspot",
-    "Common Rust",
-    "Cotton Curl Virus",
-    "Flag Smut",
-    "Gray_Leaf_Spot",
-    "Healthy",
-    "Healthy Maize",
-    "Healthy Wheat",
-    "Healthy cotton",
-    "Leaf Curl",
-    "Leaf smut",
-    "Mosaic sugarcane",
-    "RedRot sugarcane",
-    "Rice Blast",
-    "Sugarcane healthy",
-    "Tungro",
-    "Wheat Brown leaf Rust",
-    "Wheat Stem Fly",
-    "Wheat aphid",
-    "Wheat Black Rust",
-    "Wheat leaf rust",
-    "Wheat midge",
-    "Wheat powdery mildew",
-    "Wheat Scab",
-    "Wheat_Yellow_Rust",
-    "Wilt",
-    "Yellow Rust Sugarcane",
-    "bacterial blight cotton",
-    "bollrot on Cotton",
-    "bollworm on cotton",
-    "cotton mealy bug",
-    "cotton whitefly",
-    "jassid on cotton",
-    "maize ear rot",
-    "maize fall armyworm",
-    "maize stem borer",
-    "pink bollworm in cotton",
-    "red cotton bug",
-    "mites in cotton"
-]
+def resize_image(image: Image.Image, image_size: int = IMAGE_SIZE) -> Image.Image:
+    """
+    The Resize step of get_transforms on its own (same size and bilinear
+    filter), so the serving path resizes an upload once and runs both the
+    quality gate and get_tensor_transforms on the result.
+    """
+    return image.resize((image_size, image_size), Image.BILINEAR)
+
+def get_tensor_transforms():
+    """
+    get_transforms without the Resize, for images from resize_image
+    """
+    return transforms.Compose([
+        transforms.ToTensor(),
+        transforms.Normalize(mean=NORMALIZE_MEAN, std=NORMALIZE_STD)
+    ])
 
-def predict_disease(image_path: str, app_package: Dict[str, Any]) -> Tuple[str, float]:
+def predict_image(image_path: str, app_package: Dict[str, Any], with_cam: bool = False,
+                  timer: Optional[StageTimer] = None) -> Dict[str, Any]:
+    """
+    Predict the disease from an image file.
+
+    Args:
+        image_path: Path to the input image
+        app_package: Dictionary containing the model and other necessary components
+        with_cam: Also return a class activation heatmap
+        timer: Optional StageTimer recording per-stage durations when profiling
+
+    Returns:
+        Dictionary with disease, confidence percentage, the quality gate
+        report and, if requested, heatmap
+
+    Raises:
+        ImageQualityError: If the image fails the quality gate
+    """
+    timer = timer or NULL_TIMER
+    try:
+        with timer.stage("decode"):
+            image = Image.open(image_path).convert('RGB')
+        # The only pass over the full-resolution image; the gate and the
+        # tensor transforms both work on the model-sized result
+        with timer.stage("resize"):
+            image = resize_image(image)
+        with timer.stage("quality"):
+            report = check_image_quality(image, app_package.get("quality_thresholds"))
+        with timer.stage("preprocess"):
+            image_tensor = get_tensor_transforms()(image).unsqueeze(0)
+
+        result = predict_batch(image_tensor, app_package, with_cam=with_cam, timer=timer)[0]
+        result["quality"] = report
+        return result
+
+    except ImageQualityError:
+        raise
+    except Exception as e:
+        print(f"Error predicting disease: {str(e)}")
+        return {"disease": "Unknown", "confidence": 0.0}
+
+def predict_disease(image_path: str, app_package: Dict[str, Any],
+                    timer: Optional[StageTimer] = None) -> Tuple[str, float]:
     """
     Predict the disease from an image.
-    
+
     Args:
         image_path: Path to the input image
         app_package: Dictionary containing the model and other necessary components
-        
+        timer: Optional StageTimer recording per-stage durations when profiling
+
     Returns:
         Tuple containing (predicted_disease, confidence_percentage)
     """
+    result = predict_image(image_path, app_package, timer=timer)
+    return result["disease"], result["confidence"]
+
+def predict_batch(image_batch: torch.Tensor, app_package: Dict[str, Any], with_cam: bool = False,
+                  timer: Optional[StageTimer] = None) -> List[Dict[str, Any]]:
+    """
+    Predict the diseases for a batch of preprocessed images.
+
+    Args:
+        image_batch: Normalized float tensor of shape Nx3x224x224
+        app_package: Dictionary containing the model and other necessary components
+        with_cam: Also return class activation heatmaps. They are built from
+            the activations of this same forward pass, no extra pass is run
+        timer: Optional StageTimer recording per-stage durations when profiling
+
+    Returns:
+        One dictionary per image with disease, confidence percentage and,
+        if requested, a base64 PNG heatmap
+    """
     # Get the model from the app package
     model = app_package["model"]
     device = torch.device(app_package.get("device", "cpu"))
     
     # Ensure model is in evaluation mode
     model.eval()
-    
-    # Load and preprocess the image
-    try:
-        image = Image.open(image_path).convert('RGB')
-        image_tensor = get_transforms()(image).unsqueeze(0).to(device)
-        
-        # Make prediction
-        with torch.no_grad():
-            outputs = model(image_tensor)
-            probabilities = torch.nn.functional.softmax(outputs, dim=1)[0]
-            
+    timer = timer or NULL_TIMER
+
+    # Make prediction
+    with torch.no_grad():
+        with timer.stage("forward"):
+            start = time.perf_counter()
+            if with_cam:
+                outputs, features = model.forward_with_features(image_batch.to(device))
+            else:
+                outputs = model(image_batch.to(device))
+
+        with timer.stage("postprocess"):
+            probabilities = torch.nn.functional.softmax(outputs, dim=1)
+
             # Get top prediction
-            confidence, predicted_class = torch.max(probabilities, 0)
-            predicted_disease = DISEASE_CLASSES[predicted_class.item()]
-            confidence_percentage = confidence.item() * 100
-            
-            return predicted_disease, confidence_percentage
-            
-    except Exception as e:
-        print(f"Error predicting disease: {str(e)}")
-        return "Unknown", 0.0
+            confidences, predicted_classes = torch.max(probabilities, 1)
+            class_ids = predicted_classes.tolist()
+            forward_ms = (time.perf_counter() - start) * 1000
+            results = [
+                {"disease": DISEASE_CLASSES[class_id], "confidence": confidence * 100}
+                for class_id, confidence in zip(class_ids, confidences.tolist())
+            ]
+
+        if with_cam:
+            with timer.stage("cam"):
+                cams = class_activation_maps(features, model.model.fc.weight, predicted_classes,
+                                             app_package.get("cam_size", 56))
+                for result, cam in zip(results, cams):
+                    result["heatmap"] = encode_heatmap(cam)
+
+    # Hand a sample of the traffic to the candidate model, see shadow.py
+    shadow = app_package.get("shadow")
+    if shadow is not None:
+        shadow.submit(image_batch, class_ids, forward_ms)
+
+    return results
+
+def warmup_model(app_package: Dict[str, Any], batch_sizes: List[int], iterations: int = 3) -> Dict[int, float]:
+    """
+    Run synthetic batches through the preprocessing and forward path so lazy
+    allocation, kernel selection and thread-pool start-up happen before
+    real traffic arrives.
+
+    Args:
+        app_package: Dictionary containing the model and other necessary components
+        batch_sizes: Every batch size the service runs inference at
+        iterations: Forward passes per batch size
+
+    Returns:
+        Dictionary mapping batch size to the duration of its last pass in milliseconds
+    """
+    model = app_package["model"]
+    device = torch.device(app_package.get("device", "cpu"))
+    model.eval()
+
+    # Push a blank image through the real transforms as well
+    sample = get_transforms()(Image.new('RGB', (IMAGE_SIZE, IMAGE_SIZE)))
+
+    timings = {}
+    with torch.no_grad():
+        for batch_size in batch_sizes:
+            batch = sample.unsqueeze(0).repeat(batch_size, 1, 1, 1).to(device)
+            for _ in range(max(1, iterations)):
+                start = time.perf_counter()
+                model(batch)
+                if device.type == 'cuda':
+                    torch.cuda.synchronize()
+                timings[batch_size] = round((time.perf_counter() - start) * 1000, 3)
+    return timings
 
 async def predict_from_file(file_path: str, app_package: Dict[str, Any]) -> Dict[str, Any]:
     """
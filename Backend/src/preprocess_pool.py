@@ -0,0 +1,273 @@
+"""
+Decode/preprocess process pool feeding inference through a shared-memory
+ring of 3x224x224 float32 slots.
+
+Workers decode, resize, quality-check and transform the upload in their own
+process and write the result straight into a ring slot. The inference stage
+wraps that slot with torch.from_numpy, so finished tensors are never copied
+or pickled back to the serving process. Only the encoded upload travels to
+the worker and only a timing and the small quality gate report travel back.
+
+Inference runs on a dedicated pool of `inference_threads` threads (one by
+default): each forward pass already spreads over torch's intra-op threads,
+so running several at once only oversubscribes the cores.
+
+The ring has a fixed number of slots; when all of them are taken, callers
+wait for one to be released (backpressure). At most `max_waiting` callers
+wait, each holding its upload in memory; beyond that PoolBusyError is
+raised instead of queueing unbounded work.
+"""
+import asyncio
+import io
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager
+from multiprocessing import shared_memory
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+# (3, predict.IMAGE_SIZE, predict.IMAGE_SIZE); spelled out so the serving
+# process does not import torch just to size the ring
+SLOT_SHAPE = (3, 224, 224)
+SLOT_BYTES = int(np.prod(SLOT_SHAPE)) * np.dtype(np.float32).itemsize
+
+# Per worker process state, set up by _init_worker
+_worker_shm = None
+_worker_ring = None
+_worker_transform = None
+
+
+def _init_worker(shm_name: str, slots: int) -> None:
+    global _worker_shm, _worker_ring, _worker_transform
+    import torch
+    from predict import get_tensor_transforms
+
+    # Scale by adding processes, not threads inside each of them
+    torch.set_num_threads(1)
+
+    _worker_shm = shared_memory.SharedMemory(name=shm_name)
+    _worker_ring = np.ndarray((slots, *SLOT_SHAPE), dtype=np.float32, buffer=_worker_shm.buf)
+    _worker_transform = get_tensor_transforms()
+
+
+class PoolBusyError(Exception):
+    """Raised when every ring slot is taken and too many callers already wait."""
+
+
+def _preprocess_into_slot(image_bytes: bytes, slot: int,
+                          quality_thresholds: Optional[Dict[str, float]] = None
+                          ) -> Tuple[float, Optional[Dict[str, Any]]]:
+    """
+    Decode, quality-check and transform one image into `slot`.
+    Returns the busy time in seconds and the quality gate report.
+    """
+    import torch
+    from PIL import Image
+    from predict import resize_image
+    from quality import check_image_quality
+
+    start = time.perf_counter()
+    # Resize once; the gate and the tensor transforms share the result
+    image = resize_image(Image.open(io.BytesIO(image_bytes)).convert('RGB'))
+    report = check_image_quality(image, quality_thresholds)
+    torch.from_numpy(_worker_ring[slot]).copy_(_worker_transform(image))
+    return time.perf_counter() - start, report
+
+
+def _timed(fn, *args):
+    """Call fn(*args); returns the time it took in seconds and its result."""
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+class PreprocessPool:
+    """
+    Process pool plus shared-memory ring. Create it in the serving process,
+    call `warmup` before taking traffic and `close` on shutdown.
+    """
+    def __init__(self, workers: int, slots: int, inference_threads: int = 1, max_waiting: int = 32):
+        self.workers = workers
+        self.slots = slots
+        self.inference_threads = inference_threads
+        self.max_waiting = max_waiting
+
+        self._shm = shared_memory.SharedMemory(create=True, size=slots * SLOT_BYTES)
+        self._ring = np.ndarray((slots, *SLOT_SHAPE), dtype=np.float32, buffer=self._shm.buf)
+        self._free = list(range(slots))
+        self._available = asyncio.Semaphore(slots)
+
+        self._executor = self._new_executor()
+        self._inference = ThreadPoolExecutor(max_workers=inference_threads,
+                                             thread_name_prefix="inference")
+
+        self._started = time.perf_counter()
+        self._counts = {"preprocess": 0, "inference": 0}
+        self._busy = {"preprocess": 0.0, "inference": 0.0}
+        self._backpressure_waits = 0
+        self._waiting = 0
+        self._rejected = 0
+        self._restarts = 0
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        # spawn, not fork: forking a process that already runs torch threads can deadlock
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self._shm.name, self.slots),
+        )
+
+    def _restart(self, broken: ProcessPoolExecutor) -> None:
+        """Replace the executor after a worker died, once per broken executor."""
+        if self._executor is not broken:
+            return
+        print("Error in preprocess pool: a worker died, restarting the pool")
+        self._restarts += 1
+        self._executor = self._new_executor()
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> Optional["PreprocessPool"]:
+        """Build the pool, or return None when PREPROCESS_WORKERS is 0."""
+        if not config['PREPROCESS_WORKERS']:
+            return None
+        return cls(config['PREPROCESS_WORKERS'], config['PREPROCESS_RING_SLOTS'],
+                   config['PREPROCESS_INFERENCE_THREADS'], config['PREPROCESS_MAX_WAITING'])
+
+    def warmup(self) -> None:
+        """
+        Start every worker and run one blank image through each, so the first
+        requests don't pay for process spawn and the torch import.
+        """
+        from PIL import Image
+
+        buffer = io.BytesIO()
+        Image.new('RGB', SLOT_SHAPE[1:]).save(buffer, format='JPEG')
+        blank = buffer.getvalue()
+
+        # Runs before the service is ready, so the slots are not in use yet
+        futures = [self._executor.submit(_preprocess_into_slot, blank, slot % self.slots)
+                   for slot in range(self.workers)]
+        wait(futures)
+        for future in futures:
+            future.result()
+
+    @asynccontextmanager
+    async def _slot(self):
+        if self._available.locked():
+            if self._waiting >= self.max_waiting:
+                self._rejected += 1
+                raise PoolBusyError(f"All {self.slots} ring slots are in use and "
+                                    f"{self._waiting} requests are waiting")
+            self._backpressure_waits += 1
+
+        self._waiting += 1
+        try:
+            await self._available.acquire()
+        finally:
+            self._waiting -= 1
+
+        slot = self._free.pop()
+        try:
+            yield slot
+        finally:
+            self._free.append(slot)
+            self._available.release()
+
+    async def predict(self, image_bytes: bytes, app_package: Dict[str, Any],
+                      with_cam: bool = False) -> Dict[str, Any]:
+        """
+        Preprocess `image_bytes` in a worker, then run inference on its ring
+        slot off the event loop.
+
+        Returns:
+            Dictionary with disease, confidence percentage, the quality gate
+            report and, if requested, heatmap
+
+        Raises:
+            ImageQualityError: If the image fails the quality gate
+            PoolBusyError: If the ring is full and too many requests wait
+            BrokenProcessPool: If a worker died; the pool is restarted for
+                the next request
+        """
+        # Shielded, so a cancelled request still holds its slot until the
+        # worker and the forward pass are done with it
+        return await asyncio.shield(self._predict(image_bytes, app_package, with_cam))
+
+    async def _predict(self, image_bytes: bytes, app_package: Dict[str, Any],
+                       with_cam: bool) -> Dict[str, Any]:
+        import torch
+        from predict import predict_batch
+
+        loop = asyncio.get_running_loop()
+        async with self._slot() as slot:
+            executor = self._executor
+            try:
+                busy, report = await loop.run_in_executor(
+                    executor, _preprocess_into_slot, image_bytes, slot,
+                    app_package.get("quality_thresholds"),
+                )
+            except BrokenProcessPool:
+                self._restart(executor)
+                raise
+            except OSError as e:
+                # The upload is not a decodable image (PIL's UnidentifiedImageError
+                # and truncated files are OSErrors); answer like predict_image does
+                print(f"Error predicting disease: {str(e)}")
+                return {"disease": "Unknown", "confidence": 0.0}
+            self._record("preprocess", busy)
+
+            # Zero-copy 1x3x224x224 view of the slot
+            image_tensor = torch.from_numpy(self._ring[slot:slot + 1])
+            busy, results = await loop.run_in_executor(
+                self._inference, _timed, predict_batch, image_tensor, app_package, with_cam)
+            self._record("inference", busy)
+
+        results[0]["quality"] = report
+        return results[0]
+
+    def _record(self, stage: str, seconds: float) -> None:
+        self._counts[stage] += 1
+        self._busy[stage] += seconds
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Ring occupancy and, per stage, throughput while busy (what the stage
+        can sustain with all its workers) and utilization since the pool
+        started.
+        """
+        elapsed = time.perf_counter() - self._started
+        parallelism = {"preprocess": self.workers, "inference": self.inference_threads}
+        return {
+            "workers": self.workers,
+            "inference_threads": self.inference_threads,
+            "ring_slots": self.slots,
+            "ring_in_use": self.slots - len(self._free),
+            "backpressure_waits": self._backpressure_waits,
+            "waiting": self._waiting,
+            "rejected": self._rejected,
+            "restarts": self._restarts,
+            "stages": {
+                stage: {
+                    "count": count,
+                    "mean_ms": round(self._busy[stage] / count * 1000, 3) if count else 0.0,
+                    "images_per_s": round(count / self._busy[stage] * parallelism[stage], 3)
+                    if self._busy[stage] else 0.0,
+                    "utilization": round(self._busy[stage] / (elapsed * parallelism[stage]), 4)
+                    if elapsed else 0.0,
+                }
+                for stage, count in self._counts.items()
+            },
+        }
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self._inference.shutdown(wait=True, cancel_futures=True)
+        # Drop our view before closing, shared memory can't close with live exports
+        self._ring = None
+        self._shm.close()
+        self._shm.unlink()
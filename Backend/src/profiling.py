@@ -0,0 +1,176 @@
+import hmac
+import itertools
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, List, Optional
+
+from fastapi import Request
+
+_NULL_CONTEXT = nullcontext()
+
+# Profile ids are uuid4().hex; anything else never touches the filesystem
+_REQUEST_ID = re.compile(r"[0-9a-f]{32}")
+
+
+class StageTimer:
+    """
+    Collects wall-clock durations (in milliseconds) for the named stages of a
+    single request. When `record_functions` is set, every stage is also
+    labelled in the active torch.profiler trace.
+    """
+    def __init__(self, record_functions: bool = False):
+        self.stages: Dict[str, float] = OrderedDict()
+        self._record_functions = record_functions
+
+    @contextmanager
+    def stage(self, name: str):
+        if self._record_functions:
+            import torch
+            label = torch.profiler.record_function(name)
+        else:
+            label = _NULL_CONTEXT
+
+        start = time.perf_counter()
+        try:
+            with label:
+                yield
+        finally:
+            self.stages[name] = round((time.perf_counter() - start) * 1000, 3)
+
+
+class NullTimer:
+    """Stage timer used when a request is not profiled; does no work at all."""
+    stages: Dict[str, float] = {}
+
+    def stage(self, name: str):
+        return _NULL_CONTEXT
+
+
+NULL_TIMER = NullTimer()
+
+
+class ProfileStore:
+    """
+    Keeps the most recent `max_traces` profile artifacts on disk and evicts
+    the oldest one (by modification time) once the limit is reached.
+
+    The directory itself is the index, so eviction and lookups survive
+    restarts and are shared by every worker process serving the app.
+    """
+    def __init__(self, directory: str, max_traces: int):
+        self.directory = directory
+        self.max_traces = max(1, max_traces)
+        self._lock = threading.Lock()
+
+    def _path(self, request_id: str) -> str:
+        return os.path.join(self.directory, f"{request_id}.json")
+
+    def _traces(self) -> List[str]:
+        """Stored trace paths, oldest first."""
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+
+        traces = []
+        for name in names:
+            request_id, ext = os.path.splitext(name)
+            if ext != ".json" or not _REQUEST_ID.fullmatch(request_id):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                traces.append((os.path.getmtime(path), path))
+            except OSError:
+                # Evicted by another worker in the meantime
+                continue
+        return [path for _, path in sorted(traces)]
+
+    def save(self, request_id: str, prof, stages: Dict[str, float]) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(request_id)
+        partial = f"{path}.partial"
+
+        # Export the chrome trace, then attach the python stage timings to it.
+        # Chrome/Perfetto ignore unknown top-level keys.
+        prof.export_chrome_trace(partial)
+        with open(partial) as f:
+            trace = json.load(f)
+        trace["requestId"] = request_id
+        trace["stages"] = stages
+        with open(partial, "w") as f:
+            json.dump(trace, f)
+        # Only complete traces are ever visible under their final name
+        os.replace(partial, path)
+
+        with self._lock:
+            traces = self._traces()
+            for evicted in traces[:max(0, len(traces) - self.max_traces)]:
+                try:
+                    os.unlink(evicted)
+                except OSError:
+                    pass
+        return path
+
+    def get(self, request_id: str) -> Optional[str]:
+        """Path of the stored trace, or None for an unknown or malformed id."""
+        if not _REQUEST_ID.fullmatch(request_id):
+            return None
+        path = self._path(request_id)
+        return path if os.path.isfile(path) else None
+
+
+class RequestProfiler:
+    """
+    Decides which /predict requests run under torch.profiler and stores
+    their traces.
+
+    A request is profiled when an admin asks for it (`X-Profile` header or
+    `profile` query flag together with a valid `X-Admin-Token` header), or
+    when it falls on the 1-in-N sampling schedule. Sampling is disabled when
+    `sample_every` is 0, in which case only a single integer check is done.
+    """
+    def __init__(self, admin_token: Optional[str], sample_every: int, store: ProfileStore):
+        self.admin_token = admin_token
+        self.sample_every = sample_every
+        self.store = store
+        self._counter = itertools.count()
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "RequestProfiler":
+        store = ProfileStore(config['PROFILE_DIR'], config['PROFILE_MAX_TRACES'])
+        return cls(config['PROFILE_ADMIN_TOKEN'], config['PROFILE_SAMPLE_EVERY'], store)
+
+    def is_admin(self, request: Request) -> bool:
+        token = request.headers.get("X-Admin-Token")
+        if not self.admin_token or not token:
+            return False
+        # Compare bytes: compare_digest raises TypeError on non-ASCII str
+        return hmac.compare_digest(token.encode(), self.admin_token.encode())
+
+    def should_profile(self, request: Request) -> bool:
+        flag = request.headers.get("X-Profile") or request.query_params.get("profile")
+        if flag and flag.lower() not in ("0", "false") and self.is_admin(request):
+            return True
+        if self.sample_every:
+            return next(self._counter) % self.sample_every == 0
+        return False
+
+    @contextmanager
+    def profile(self, request_id: str):
+        """Run the enclosed block under torch.profiler and store its trace."""
+        import torch
+        from torch.profiler import ProfilerActivity, profile
+
+        activities = [ProfilerActivity.CPU]
+        if torch.cuda.is_available():
+            activities.append(ProfilerActivity.CUDA)
+
+        timer = StageTimer(record_functions=True)
+        with profile(activities=activities, record_shapes=True) as prof:
+            yield timer
+        self.store.save(request_id, prof, timer.stages)
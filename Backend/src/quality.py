@@ -0,0 +1,174 @@
+"""
+Cheap image quality gate run before the model.
+
+A small thumbnail of the upload, taken from the model-sized image the serving
+path resizes to anyway, is checked for blur (variance of the Laplacian),
+exposure (brightness histogram) and how much of it looks like vegetation
+(excess-green index). Images that fail are answered with a
+"retake photo" response instead of a forward pass.
+"""
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, Optional
+
+import numpy as np
+from PIL import Image
+
+THUMBNAIL_SIZE = 128
+
+# Histogram levels below / above which a pixel counts as crushed / clipped
+DARK_LEVEL = 32
+BRIGHT_LEVEL = 224
+
+# Pixels whose excess-green index (2G - R - B) / (R + G + B) is above this
+# count as vegetation
+EXCESS_GREEN_LEVEL = 0.05
+
+# Multiply-adds of one ResNet18 forward pass at 224x224, in GFLOPs
+RESNET18_GFLOPS = 1.82
+
+RETAKE_MESSAGES = {
+    "blurry": "The photo is blurry. Hold the camera steady and focus on the leaf.",
+    "too_dark": "The photo is too dark. Take it in daylight or with more light.",
+    "overexposed": "The photo is overexposed. Avoid direct sunlight or flash glare.",
+    "no_plant": "No plant was found. Fill the frame with the affected leaf or plant.",
+}
+
+
+class ImageQualityError(Exception):
+    """Raised when an image fails the quality gate; carries the gate report."""
+    def __init__(self, report: Dict[str, Any]):
+        super().__init__(report)
+        self.report = report
+
+
+def assess_image_quality(image: Image.Image, thresholds: Dict[str, float]) -> Dict[str, Any]:
+    """
+    Measure blur, exposure and vegetation on a thumbnail of `image`.
+
+    Args:
+        image: RGB image, on the serving path the one resized for the model
+        thresholds: QUALITY_THRESHOLDS from the config
+
+    Returns:
+        Report with ok, the failed checks as reasons, the raw metrics and
+        the time the gate took in milliseconds
+    """
+    start = time.perf_counter()
+
+    # Cheap when `image` is already model-sized; never pass a full-resolution
+    # upload here, that resize costs as much as the forward pass it saves
+    thumbnail = image.resize((THUMBNAIL_SIZE, THUMBNAIL_SIZE), Image.BILINEAR)
+    rgb = np.asarray(thumbnail, dtype=np.float32)
+    red, green, blue = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+
+    gray = 0.299 * red + 0.587 * green + 0.114 * blue
+
+    # 4-neighbour Laplacian on the interior pixels
+    laplacian = (gray[:-2, 1:-1] + gray[2:, 1:-1] + gray[1:-1, :-2] + gray[1:-1, 2:]
+                 - 4 * gray[1:-1, 1:-1])
+    sharpness = float(laplacian.var())
+
+    histogram = np.bincount(gray.astype(np.uint8).ravel(), minlength=256)
+    pixels = histogram.sum()
+    dark_fraction = float(histogram[:DARK_LEVEL].sum() / pixels)
+    bright_fraction = float(histogram[BRIGHT_LEVEL:].sum() / pixels)
+    brightness = float(gray.mean())
+
+    excess_green = (2 * green - red - blue) / (red + green + blue + 1e-6)
+    vegetation = float((excess_green > EXCESS_GREEN_LEVEL).mean())
+
+    # (code, metric, value, threshold, failed); a code can have several
+    # sub-checks and reports the first one that failed
+    checks = [
+        ("blurry", "sharpness", sharpness, thresholds["min_sharpness"],
+         sharpness < thresholds["min_sharpness"]),
+        ("too_dark", "brightness", brightness, thresholds["min_brightness"],
+         brightness < thresholds["min_brightness"]),
+        ("too_dark", "dark_fraction", dark_fraction, thresholds["max_dark_fraction"],
+         dark_fraction > thresholds["max_dark_fraction"]),
+        ("overexposed", "brightness", brightness, thresholds["max_brightness"],
+         brightness > thresholds["max_brightness"]),
+        ("overexposed", "bright_fraction", bright_fraction, thresholds["max_bright_fraction"],
+         bright_fraction > thresholds["max_bright_fraction"]),
+        ("no_plant", "vegetation", vegetation, thresholds["min_vegetation"],
+         vegetation < thresholds["min_vegetation"]),
+    ]
+    failures = {}
+    for code, metric, value, threshold, failed in checks:
+        if failed and code not in failures:
+            failures[code] = {"code": code, "message": RETAKE_MESSAGES[code], "metric": metric,
+                             "value": round(value, 4), "threshold": threshold}
+    reasons = list(failures.values())
+
+    return {
+        "ok": not reasons,
+        "reasons": reasons,
+        "metrics": {
+            "sharpness": round(sharpness, 3),
+            "brightness": round(brightness, 3),
+            "dark_fraction": round(dark_fraction, 4),
+            "bright_fraction": round(bright_fraction, 4),
+            "vegetation": round(vegetation, 4),
+        },
+        "gate_ms": round((time.perf_counter() - start) * 1000, 3),
+    }
+
+
+def check_image_quality(image: Image.Image, thresholds: Optional[Dict[str, float]]) -> Optional[Dict[str, Any]]:
+    """
+    Run the gate when `thresholds` is set.
+
+    Returns:
+        The report of a passing image, or None when the gate is disabled
+
+    Raises:
+        ImageQualityError: If the image fails the gate
+    """
+    if not thresholds:
+        return None
+    report = assess_image_quality(image, thresholds)
+    if not report["ok"]:
+        raise ImageQualityError(report)
+    return report
+
+
+class QualityStats:
+    """Counts gate outcomes and estimates the model compute they saved."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._checked = 0
+        self._rejected = 0
+        self._gate_ms = 0.0
+        self._reasons = Counter()
+
+    def record(self, report: Optional[Dict[str, Any]]) -> None:
+        if report is None:
+            return
+        with self._lock:
+            self._checked += 1
+            self._gate_ms += report["gate_ms"]
+            if not report["ok"]:
+                self._rejected += 1
+                self._reasons.update(reason["code"] for reason in report["reasons"])
+
+    def summary(self, forward_ms: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Args:
+            forward_ms: Duration of one batch-1 forward pass, e.g. from warm-up
+        """
+        with self._lock:
+            checked, rejected, gate_ms = self._checked, self._rejected, self._gate_ms
+            reasons = dict(self._reasons)
+
+        return {
+            "checked": checked,
+            "rejected": rejected,
+            "rejection_rate": round(rejected / checked, 4) if checked else 0.0,
+            "reasons": reasons,
+            "gate_ms_mean": round(gate_ms / checked, 3) if checked else 0.0,
+            "forward_ms_estimate": forward_ms,
+            "model_ms_saved": round(rejected * forward_ms, 1) if forward_ms else None,
+            "gflops_saved": round(rejected * RESNET18_GFLOPS, 2),
+        }
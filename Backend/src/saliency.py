@@ -0,0 +1,51 @@
+"""
+Class activation maps (CAM) for the ResNet18 classifier.
+
+ResNet18 ends in global average pooling followed by a single linear layer,
+so the logit of class c is the spatial mean of sum_k w[c, k] * A_k, where
+A_k are the final conv activations. Weighting the activations by the fc
+row of the predicted class gives its heatmap directly, without the backward
+pass Grad-CAM needs.
+"""
+import base64
+import io
+
+import torch
+import torch.nn.functional as F
+from PIL import Image
+
+
+def class_activation_maps(features: torch.Tensor, fc_weight: torch.Tensor,
+                          class_ids: torch.Tensor, size: int) -> torch.Tensor:
+    """
+    Build one heatmap per image for the given classes.
+
+    Args:
+        features: Final conv activations of shape NxKxHxW
+        fc_weight: Weight of the final linear layer, shape num_classes x K
+        class_ids: Class to explain for each image, shape N
+        size: Side length of the returned heatmaps
+
+    Returns:
+        uint8 tensor of shape N x size x size on the CPU, scaled to 0-255 per image
+    """
+    weights = fc_weight[class_ids]
+    cams = F.relu(torch.einsum('nk,nkhw->nhw', weights, features)).unsqueeze(1)
+    cams = F.interpolate(cams, size=(size, size), mode='bilinear', align_corners=False).squeeze(1)
+
+    # Min-max normalize each heatmap on its own
+    flat = cams.flatten(1)
+    low = flat.min(dim=1).values.view(-1, 1, 1)
+    high = flat.max(dim=1).values.view(-1, 1, 1)
+    cams = (cams - low) / (high - low).clamp_min(1e-6)
+
+    return cams.mul_(255).round_().to(torch.uint8).cpu()
+
+
+def encode_heatmap(cam: torch.Tensor) -> str:
+    """
+    Encode a single uint8 heatmap as a base64 grayscale PNG.
+    """
+    buffer = io.BytesIO()
+    Image.fromarray(cam.numpy(), mode='L').save(buffer, format='PNG', optimize=True)
+    return base64.b64encode(buffer.getvalue()).decode('ascii')
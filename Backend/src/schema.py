@@ -1,5 +1,6 @@
 from pydantic import BaseModel, EmailStr, ConfigDict
-from typing import Optional, Dict
+from datetime import date
+from typing import Optional, Dict, List
 
 class UserCreate(BaseModel):
     email: EmailStr
@@ -19,10 +20,24 @@ class InferenceOutput(BaseModel):
     disease: str
     solution: Optional[Dict[str, str]] = None
     confidence: float
+    heatmap: Optional[str] = None
+    profile_id: Optional[str] = None
 
 class InferenceResponse(BaseModel):
     error: Optional[str] = None
     result: Optional[InferenceOutput] = None
 
+class DiseaseStat(BaseModel):
+    day: date
+    disease: str
+    region: Optional[str] = None
+    count: int
+    mean_confidence: float
+
+class StatsResponse(BaseModel):
+    start: date
+    end: date
+    stats: List[DiseaseStat]
+
 class ErrorResponse(BaseModel):
     error: str
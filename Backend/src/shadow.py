@@ -0,0 +1,211 @@
+"""
+Shadow evaluation of a candidate checkpoint on sampled live traffic.
+
+A configurable fraction of the inputs served by predict_batch is handed to a
+candidate model running in its own worker process, limited to
+SHADOW_THREADS torch threads, so its forward passes cannot take cores from
+the serving forward pass. The serving path only samples, copies the input
+batch and enqueues it; when SHADOW_MAX_PENDING batches are already waiting
+the sample is dropped instead of queued, so shadow work can never build a
+backlog or hold up a response.
+"""
+import multiprocessing
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Tuple
+
+import torch
+
+from labels import DISEASE_CLASSES
+
+# Candidate model of the shadow worker process, set up by _init_worker
+_worker_model = None
+_worker_device = None
+
+
+def _init_worker(model_path: str, device: str, threads: int) -> None:
+    global _worker_model, _worker_device
+    from model import load_model
+    from predict import warmup_model
+
+    # The whole CPU budget of the candidate; torch's intra-op pool is per
+    # process, so this cannot affect the serving process
+    torch.set_num_threads(threads)
+
+    _worker_device = torch.device(device)
+    _worker_model = load_model(model_path, device)
+    warmup_model({"model": _worker_model, "device": device}, [1])
+
+
+def _evaluate(image_batch: torch.Tensor) -> Tuple[List[int], float]:
+    """Run the candidate on one batch; returns its top-1 classes and latency in ms."""
+    with torch.no_grad():
+        start = time.perf_counter()
+        outputs = _worker_model(image_batch.to(_worker_device))
+        candidate_classes = outputs.argmax(dim=1).tolist()
+        return candidate_classes, (time.perf_counter() - start) * 1000
+
+
+def _noop() -> None:
+    pass
+
+
+class ShadowEvaluator:
+    """
+    Runs a candidate Model next to the serving one and records its latency
+    and top-1 agreement with the serving prediction, per serving class.
+    """
+    def __init__(self, model_path: str, device: str, sample_rate: float,
+                 max_pending: int, threads: int = 1, name: str = "candidate"):
+        self.sample_rate = sample_rate
+        self.max_pending = max_pending
+        self.threads = threads
+        self.name = name
+
+        # spawn, not fork: forking a process that already runs torch threads can deadlock
+        self._executor = ProcessPoolExecutor(
+            max_workers=1,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(model_path, device, threads),
+        )
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._submitted = 0
+        self._dropped = 0
+        self._errors = 0
+        self._disabled = None
+
+        self._serving_ms = deque(maxlen=1000)
+        self._candidate_ms = deque(maxlen=1000)
+        self._per_class = {class_id: {"count": 0, "agree": 0, "candidate_ms": 0.0}
+                           for class_id in range(len(DISEASE_CLASSES))}
+
+    def warmup(self) -> None:
+        """Start the worker process and load and warm up the candidate in it."""
+        self._executor.submit(_noop).result()
+
+    def submit(self, image_batch: torch.Tensor, serving_classes: List[int], serving_ms: float) -> None:
+        """
+        Maybe enqueue a served batch for the candidate. Called on the response
+        path, so it only samples, copies and enqueues; pickling and sending the
+        batch to the worker happen on the executor's own thread. Never raises:
+        if the worker process is gone, shadowing is disabled instead.
+
+        Args:
+            image_batch: The exact model input the serving model saw
+            serving_classes: Top-1 class ids predicted by the serving model
+            serving_ms: Serving forward pass duration in milliseconds
+        """
+        if self._disabled is not None or random.random() >= self.sample_rate:
+            return
+
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._dropped += 1
+                return
+            self._pending += 1
+            self._submitted += 1
+
+        # Never let the candidate fail a response the serving model has answered
+        try:
+            # Copy, as the caller may reuse the buffer (e.g. a preprocess ring slot)
+            future = self._executor.submit(_evaluate, image_batch.detach().cpu().clone())
+        except Exception as e:
+            with self._lock:
+                self._pending -= 1
+                self._errors += 1
+            self._disable(e)
+            return
+        future.add_done_callback(lambda done: self._record(done, serving_classes, serving_ms))
+
+    def _disable(self, error: Exception) -> None:
+        """Stop sampling for good once the worker process is gone."""
+        if self._disabled is not None:
+            return
+        print(f"Error in shadow evaluation, disabling it: {str(error)}")
+        self._disabled = str(error) or type(error).__name__
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _record(self, future: Future, serving_classes: List[int], serving_ms: float) -> None:
+        try:
+            candidate_classes, candidate_ms = future.result()
+        except CancelledError:
+            with self._lock:
+                self._pending -= 1
+            return
+        except Exception as e:
+            with self._lock:
+                self._pending -= 1
+                self._errors += 1
+            if isinstance(e, BrokenProcessPool):
+                self._disable(e)
+            else:
+                print(f"Error in shadow evaluation: {str(e)}")
+            return
+
+        with self._lock:
+            self._pending -= 1
+            self._serving_ms.append(serving_ms)
+            self._candidate_ms.append(candidate_ms)
+            share = candidate_ms / len(serving_classes)
+            for serving_class, candidate_class in zip(serving_classes, candidate_classes):
+                stats = self._per_class[serving_class]
+                stats["count"] += 1
+                stats["agree"] += serving_class == candidate_class
+                stats["candidate_ms"] += share
+
+    def stats(self) -> Dict[str, Any]:
+        """Sampling counters, latency percentiles and agreement per class."""
+        with self._lock:
+            serving_ms = sorted(self._serving_ms)
+            candidate_ms = sorted(self._candidate_ms)
+            per_class = {DISEASE_CLASSES[class_id]: dict(stats)
+                         for class_id, stats in self._per_class.items() if stats["count"]}
+            counters = {
+                "submitted": self._submitted,
+                "dropped": self._dropped,
+                "pending": self._pending,
+                "errors": self._errors,
+            }
+            disabled = self._disabled
+
+        evaluated = sum(stats["count"] for stats in per_class.values())
+        agreed = sum(stats["agree"] for stats in per_class.values())
+        return {
+            "candidate": self.name,
+            "sample_rate": self.sample_rate,
+            "threads": self.threads,
+            "disabled": disabled,
+            **counters,
+            "evaluated": evaluated,
+            "agreement": round(agreed / evaluated, 4) if evaluated else None,
+            "latency_ms": {
+                "serving": _percentiles(serving_ms),
+                "candidate": _percentiles(candidate_ms),
+            },
+            "per_class": {
+                disease: {
+                    "count": stats["count"],
+                    "agreement": round(stats["agree"] / stats["count"], 4),
+                    "candidate_mean_ms": round(stats["candidate_ms"] / stats["count"], 3),
+                }
+                for disease, stats in per_class.items()
+            },
+        }
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _percentiles(sorted_ms: List[float]) -> Dict[str, Any]:
+    if not sorted_ms:
+        return {"p50": None, "p95": None}
+    return {
+        "p50": round(sorted_ms[len(sorted_ms) // 2], 3),
+        "p95": round(sorted_ms[min(len(sorted_ms) - 1, int(len(sorted_ms) * 0.95))], 3),
+    }
@@ -0,0 +1,98 @@
+"""
+Binary ingest of images that were already resized (and optionally normalized)
+on the client, e.g. by edge gateways. Payloads skip JPEG encode/decode and
+resizing entirely and are wrapped into tensors without copying.
+
+Payload layout, all fields little-endian:
+
+    offset  size  field
+    0       4     magic b"CDT1"
+    4       1     dtype: 1 = uint8 HxWx3 RGB, 2 = float32 3xHxW normalized
+    5       3     reserved, zero
+    8       4     height, must be 224
+    12      4     width, must be 224
+    16      ...   pixel data, exactly height * width * 3 elements
+
+The 16 byte header keeps float32 data 4-byte aligned. float32 pixel data is
+wrapped in place on little-endian hosts and byte-swapped into a copy on
+big-endian ones.
+"""
+import struct
+import sys
+import warnings
+
+import numpy as np
+import torch
+
+from predict import IMAGE_SIZE, NORMALIZE_MEAN, NORMALIZE_STD
+
+HEADER = struct.Struct("<4sB3xII")
+MAGIC = b"CDT1"
+
+DTYPE_UINT8_HWC = 1
+DTYPE_FLOAT32_CHW = 2
+
+_ELEMENT_TYPES = {
+    DTYPE_UINT8_HWC: torch.uint8,
+    DTYPE_FLOAT32_CHW: torch.float32,
+}
+
+# Largest valid payload: a float32 image; bodies above this are refused
+# before they are read
+MAX_PAYLOAD_BYTES = HEADER.size + 3 * IMAGE_SIZE * IMAGE_SIZE * 4
+
+_MEAN = torch.tensor(NORMALIZE_MEAN).view(3, 1, 1)
+_STD = torch.tensor(NORMALIZE_STD).view(3, 1, 1)
+
+
+def parse_tensor_payload(payload: bytes) -> torch.Tensor:
+    """
+    Parse a binary payload into a model input tensor.
+
+    Args:
+        payload: Request body laid out as described in the module docstring
+
+    Returns:
+        Normalized float tensor of shape 1x3x224x224
+
+    Raises:
+        ValueError: If the header or the payload size is invalid
+    """
+    if len(payload) < HEADER.size:
+        raise ValueError(f"Payload shorter than the {HEADER.size} byte header")
+
+    magic, dtype, height, width = HEADER.unpack_from(payload)
+    if magic != MAGIC:
+        raise ValueError(f"Bad magic {magic!r}, expected {MAGIC!r}")
+    if dtype not in _ELEMENT_TYPES:
+        raise ValueError(f"Unsupported dtype code {dtype}")
+    if (height, width) != (IMAGE_SIZE, IMAGE_SIZE):
+        raise ValueError(f"Expected {IMAGE_SIZE}x{IMAGE_SIZE} image, got {height}x{width}")
+
+    element_type = _ELEMENT_TYPES[dtype]
+    count = height * width * 3
+    expected = HEADER.size + count * element_type.itemsize
+    if len(payload) != expected:
+        raise ValueError(f"Expected {expected} bytes for a {height}x{width} payload, got {len(payload)}")
+
+    if element_type.itemsize > 1 and sys.byteorder != "little":
+        # torch.frombuffer reads native byte order
+        data = torch.from_numpy(
+            np.frombuffer(payload, dtype="<f4", count=count, offset=HEADER.size).astype(np.float32))
+    else:
+        # Zero-copy view over the request body. The buffer is read-only, which
+        # torch warns about; nothing below writes to it
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", UserWarning)
+            data = torch.frombuffer(payload, dtype=element_type, count=count, offset=HEADER.size)
+
+    if dtype == DTYPE_UINT8_HWC:
+        # Same scaling and normalization as get_transforms, minus the resize
+        image = data.view(height, width, 3).permute(2, 0, 1)
+        tensor = image.float().div_(255).sub_(_MEAN).div_(_STD)
+    else:
+        tensor = data.view(3, height, width)
+        if not torch.isfinite(tensor).all():
+            raise ValueError("Payload contains NaN or infinite values")
+
+    return tensor.unsqueeze(0)
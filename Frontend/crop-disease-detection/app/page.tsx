@@ -26,10 +26,19 @@ interface PredictionResult {
   confidence: number;
 }
 
+interface RetakeReason {
+  code: string;
+  message: string;
+  metric: string;
+  value: number;
+  threshold: number;
+}
+
 export default function Home() {
   const [selectedImage, setSelectedImage] = useState<string | null>(null);
   const [isLoading, setIsLoading] = useState(false);
   const [error, setError] = useState<string | null>(null);
+  const [retakeReasons, setRetakeReasons] = useState<RetakeReason[]>([]);
   const [result, setResult] = useState<PredictionResult | null>(null);
 
   const handleImageChange = (e: React.ChangeEvent<HTMLInputElement>) => {
@@ -42,6 +51,7 @@ export default function Home() {
       reader.readAsDataURL(file);
       setResult(null);
       setError(null);
+      setRetakeReasons([]);
     }
   };
 
@@ -50,6 +60,7 @@ export default function Home() {
 
     setIsLoading(true);
     setError(null);
+    setRetakeReasons([]);
 
     try {
       // Create a FormData object to send the actual image file
@@ -77,6 +88,16 @@ export default function Home() {
         }
       );
 
+      // The quality gate rejected the photo, show why so it can be retaken.
+      // Other 422s are request validation errors
+      if (response.status === 422) {
+        const { detail } = await response.json();
+        if (detail?.code === "retake_photo") {
+          setRetakeReasons(detail.reasons ?? []);
+          throw new Error(detail.message);
+        }
+      }
+
       if (!response.ok) {
         throw new Error("Failed to get prediction");
       }
@@ -153,7 +174,16 @@ export default function Home() {
             <Alert variant="destructive">
               <AlertCircle className="h-4 w-4" />
               <AlertTitle>Error</AlertTitle>
-              <AlertDescription>{error}</AlertDescription>
+              <AlertDescription>
+                {error}
+                {retakeReasons.length > 0 && (
+                  <ul className="mt-2 list-disc pl-4">
+                    {retakeReasons.map((reason) => (
+                      <li key={reason.code}>{reason.message}</li>
+                    ))}
+                  </ul>
+                )}
+              </AlertDescription>
             </Alert>
           )}
 